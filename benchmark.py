@@ -0,0 +1,126 @@
+import argparse
+import cProfile
+import pstats
+from pathlib import Path
+from random import Random
+from time import perf_counter
+from typing import List, Sequence
+
+import numpy as np
+from scipy.stats import spearmanr
+
+from wiki_game_ai.config import CONFIG
+from wiki_game_ai.encoders import ENCODERS, create_encoder, normalize
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.replay import RecordingDiverged, RecordingExhausted, create_replay_crawler
+
+REFERENCE_ENCODER = "sentence_transformer"
+NUM_GOALS = 25
+NUM_CANDIDATES = 250
+TOP_K = 10
+# Strategies making the same choices when replayed, the others search until a deadline that also counts compute time
+REPLAY_STRATEGIES = ("depth_first", "america_first", "mcts")
+SAMPLE_TITLES = [
+    "United States", "NASA", "Data science", "Apollo program", "Moon", "Space exploration", "Physics",
+    "Albert Einstein", "World War II", "Germany", "Berlin", "Europe", "Netherlands", "Amsterdam", "Football",
+    "Association football", "FIFA World Cup", "Music", "The Beatles", "Rock music", "Computer science",
+    "Artificial intelligence", "Machine learning", "Statistics", "Mathematics", "Biology", "Evolution",
+    "Charles Darwin", "Banana", "Agriculture", "Food", "Coffee", "Brazil", "South America", "Amazon River",
+    "Climate change", "Ocean", "Pacific Ocean", "Japan", "Tokyo", "Video game", "Nintendo", "Film",
+    "Hollywood", "Literature", "William Shakespeare", "Philosophy", "Ancient Greece", "Roman Empire", "Christianity",
+]
+
+
+def benchmark_encoders(titles: List[str], encoders: Sequence[str]):
+    """ Report the encode throughput of every encoder and its ranking agreement with the full Sentence Transformer. """
+    random = Random(0)
+    goals = random.sample(range(len(titles)), min(NUM_GOALS, len(titles)))
+    candidates = [np.array(random.sample([i for i in range(len(titles)) if i != goal],
+                                         min(NUM_CANDIDATES, len(titles) - 1))) for goal in goals]
+
+    print(f"Ranking {len(candidates[0])} candidates for {len(goals)} goals out of {len(titles)} titles")
+    print(f"{'encoder':<34}{'texts/s':>10}{'spearman':>10}{'top-1':>8}{f'top-{TOP_K}':>8}")
+
+    reference_rankings = None
+    for name in [REFERENCE_ENCODER] + [name for name in encoders if name != REFERENCE_ENCODER]:
+        encoder = create_encoder(name, CONFIG['language_model_name'])
+
+        start = perf_counter()
+        embeddings = normalize(encoder.encode(titles))
+        throughput = len(titles) / (perf_counter() - start)
+
+        scores = [embeddings[indices] @ embeddings[goal] for goal, indices in zip(goals, candidates)]
+        rankings = [np.argsort(score)[::-1] for score in scores]
+        if reference_rankings is None:
+            reference_scores, reference_rankings = scores, rankings
+
+        spearman = np.mean([spearmanr(score, reference_score)[0]
+                            for score, reference_score in zip(scores, reference_scores)])
+        top_1 = np.mean([ranking[0] == reference[0] for ranking, reference in zip(rankings, reference_rankings)])
+        top_k = np.mean([len(set(ranking[:TOP_K]) & set(reference[:TOP_K])) / TOP_K
+                         for ranking, reference in zip(rankings, reference_rankings)])
+
+        print(f"{name:<34}{throughput:>10.0f}{spearman:>10.3f}{top_1:>8.2f}{top_k:>8.2f}")
+
+
+def benchmark_replay(filename: Path, strategy: str, num_stats: int):
+    """ Replay a recorded game with the given strategy and profile the crawler. """
+    from run import STRATEGIES, seed
+    from wiki_game_ai.similarity import SimilarityRanker
+
+    crawler = create_replay_crawler(filename)
+    if crawler.driver.replay.seed is not None:
+        seed(crawler.driver.replay.seed)
+    ranker = SimilarityRanker()
+    profiler = cProfile.Profile()
+
+    start = perf_counter()
+    profiler.enable()
+    try:
+        STRATEGIES[strategy](crawler, ranker)
+    except (RecordingExhausted, RecordingDiverged) as ex:
+        print(ex)
+    finally:
+        profiler.disable()
+    elapsed = perf_counter() - start
+
+    replay = crawler.driver.replay
+    print(f"Replayed {replay.cursor} of {len(replay.events)} interactions in {elapsed:.2f}s, "
+          f"recorded {sum(event['duration'] for event in replay.events):.2f}s in the driver")
+    print(f"{'interaction':<24}{'count':>8}{'recorded s':>12}")
+    for name, count in sorted(replay.counts.items(), key=lambda x: replay.durations[x[0]], reverse=True):
+        print(f"{name:<24}{count:>8}{replay.durations[name]:>12.3f}")
+
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(r"crawler\.py", num_stats)
+
+
+def load_titles(filename: str = None) -> List[str]:
+    if filename:
+        with open(filename, "r") as file:
+            titles = [line.strip() for line in file if line.strip()]
+    else:
+        titles = LinkStore().get_titles() or SAMPLE_TITLES
+    return list(dict.fromkeys(titles))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    encoders_parser = subparsers.add_parser("encoders", help="encoder throughput and ranking agreement")
+    encoders_parser.add_argument("--encoders", nargs="+", choices=list(ENCODERS), default=list(ENCODERS))
+    encoders_parser.add_argument("--titles", type=str, default=None,
+                                 help="file with one title per line, defaults to the titles in the link store")
+
+    replay_parser = subparsers.add_parser("replay", help="profile the crawler on a recorded game")
+    replay_parser.add_argument("recording", type=str, help="file recorded with run.py --record")
+    replay_parser.add_argument("strategy", type=str, nargs="?", default="depth_first",
+                               choices=REPLAY_STRATEGIES,
+                               help="the strategy used while recording, only strategies that replay deterministically")
+    replay_parser.add_argument("--stats", type=int, default=25, help="number of profiled functions to print")
+    args = parser.parse_args()
+
+    if args.benchmark == "encoders":
+        benchmark_encoders(load_titles(args.titles), args.encoders)
+    elif args.benchmark == "replay":
+        benchmark_replay(Path(args.recording), args.strategy, args.stats)
@@ -1,25 +1,52 @@
 import argparse
+from pathlib import Path
+from random import randrange
 
-from wiki_game_ai.crawler import WikiGameCrawler
+from wiki_game_ai.crawler import WikiGameCrawler, create_firefox_driver
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.path_cache import PathCache
+from wiki_game_ai.replay import RecordingDriver
 from wiki_game_ai.similarity import SimilarityRanker
-from wiki_game_ai.strategies import america_first, depth_first, iddfs, mcts
+from wiki_game_ai.strategies import america_first, depth_first, iddfs, mcts, parallel_iddfs, parallel_mcts
 
-CRAWLER = WikiGameCrawler()
-RANKER = SimilarityRanker()
+STRATEGIES = {
+    "depth_first": depth_first.run,
+    "america_first": america_first.run,
+    "mcts": mcts.run,
+    "iddfs": iddfs.run,
+    "parallel_iddfs": parallel_iddfs.run,
+    "root_parallel_mcts": parallel_mcts.run,
+    "leaf_parallel_mcts": lambda crawler, ranker: parallel_mcts.run(crawler, ranker, leaf_parallel=True),
+}
+
+
+def seed(value: int):
+    """ Seed the random choices of the strategies, so a replayed game makes the same choices as the recording. """
+    for strategy in (depth_first, america_first):
+        strategy.RANDOM.seed(value)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("strategy", type=str, default="depth_first")
+    parser.add_argument("--record", type=str, default=None,
+                        help="record all browser interactions to this file, the caches are not used while recording")
     args = parser.parse_args()
 
-    if args.strategy == "depth_first":
-        depth_first.run(CRAWLER, RANKER)
-    elif args.strategy == "america_first":
-        america_first.run(CRAWLER, RANKER)
-    elif args.strategy == "mcts":
-        mcts.run(CRAWLER, RANKER)
-    elif args.strategy == "iddfs":
-        iddfs.run(CRAWLER, RANKER)
-    else:
+    if args.strategy not in STRATEGIES:
         raise ValueError("Invalid strategy")
+
+    if args.record:
+        recording_seed = randrange(2 ** 32)
+        seed(recording_seed)
+        driver = RecordingDriver(create_firefox_driver(), Path(args.record), recording_seed)
+        crawler = WikiGameCrawler(driver_factory=lambda: driver)
+    else:
+        link_store = LinkStore()
+        crawler = WikiGameCrawler(PathCache(link_store), link_store)
+
+    try:
+        STRATEGIES[args.strategy](crawler, SimilarityRanker())
+    finally:
+        if args.record:
+            driver.close_recording()
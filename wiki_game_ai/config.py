@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Any
 
 import yaml
@@ -9,3 +10,4 @@ def load_yaml(filename: str) -> Any:
 
 
 CONFIG = load_yaml("config.yaml")
+CACHE_DIRECTORY = Path(CONFIG.get("cache_directory", ".cache"))
@@ -1,6 +1,6 @@
 import re
 from time import sleep
-from typing import Callable, Sequence
+from typing import Any, Callable, Optional, Sequence
 
 from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
@@ -10,13 +10,17 @@ from selenium.webdriver.support.expected_conditions import presence_of_element_l
 from selenium.webdriver.support.wait import WebDriverWait
 from webdriver_manager.firefox import GeckoDriverManager
 
-from wiki_game_ai.models import Link
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.models import Link, normalize_url_prefix
+from wiki_game_ai.path_cache import PathCache
+from wiki_game_ai.scheduler import MoveScheduler
 
 BASE_URL = "https://www.thewikigame.com"
 IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
 TIMEOUT = 3
 RETRIES = 3
 RETRY_DELAY = 0.2
+POLL_FREQUENCY = 0.5
 
 
 def text_changed(locator, previous_text):
@@ -29,23 +33,40 @@ def text_changed(locator, previous_text):
     return _predicate
 
 
+def create_firefox_driver():
+    driver = webdriver.Firefox(executable_path=GeckoDriverManager().install())
+    driver.implicitly_wait(TIMEOUT)
+    return driver
+
+
 class WikiGameCrawler:
-    def __init__(self):
+    def __init__(self, path_cache: Optional[PathCache] = None, link_store: Optional[LinkStore] = None,
+                 driver_factory: Callable[[], Any] = create_firefox_driver):
         self.start = None
         self.goal = None
         self.current = None
+        self.path = []
+        self.path_cache = path_cache
+        self.link_store = link_store
+        self.scheduler = MoveScheduler()
+        self.driver_factory = driver_factory
+        self.poll_frequency = POLL_FREQUENCY
+        self.retry_delay = RETRY_DELAY
         self._driver = None
 
     @property
     def driver(self):
         if not self._driver:
-            self._driver = webdriver.Firefox(executable_path=GeckoDriverManager().install())
-            self._driver.implicitly_wait(TIMEOUT)
+            self._driver = self.driver_factory()
         return self._driver
 
+    def _wait(self, **kwargs) -> WebDriverWait:
+        return WebDriverWait(self.driver, TIMEOUT, poll_frequency=self.poll_frequency, **kwargs)
+
     def new_game(self, bot_name: str = None, group_code: str = None):
         try:
             self.current = None
+            self.path = []
 
             self.driver.get(BASE_URL)
 
@@ -56,21 +77,23 @@ class WikiGameCrawler:
 
             if self.url_suffix == "group":
                 locator = (By.XPATH, "//div[. = 'Start']/following-sibling::div")
-                self.start = WebDriverWait(self.driver, TIMEOUT).until(text_changed(locator, "Start article..."))\
+                self.start = self._wait().until(text_changed(locator, "Start article..."))\
                     .text.replace(" ", "_")
                 print(f"Start: {self.start}")
 
                 locator = (By.XPATH, "//div[. = 'Goal']/following-sibling::div")
-                self.goal = WebDriverWait(self.driver, TIMEOUT).until(text_changed(locator, "Goal article..."))\
+                self.goal = self._wait().until(text_changed(locator, "Goal article..."))\
                     .text.replace(" ", "_")
                 print(f"Goal: {self.goal}")
 
                 self.current = self.start
+                self.path = [self.start]
 
                 self._scroll_down()
 
                 self.click_button(self.get_new_game_button)
 
+            self.scheduler.new_round()
             print("Game started!")
 
         except Exception as ex:
@@ -88,6 +111,14 @@ class WikiGameCrawler:
             self.goal = elements[1].text.replace(" ", "_")
             print(f"Start: {self.start} \t Current: {self.current} \t Goal: {self.goal}")
 
+            if not self.path:
+                self.path = [self.start]
+
+            url_suffix = self.url_suffix
+            if self.link_store and (links := self.link_store.get(url_suffix)):
+                print(f"Returning {len(links)} stored links")
+                return links
+
             print("Collecting hyperlinks...")
             script = """
                 return Array.from(document.querySelectorAll('a')).map(function(element) {
@@ -116,6 +147,9 @@ class WikiGameCrawler:
 
                 links.append(Link(title, text, href))
 
+            if self.link_store:
+                self.link_store.add(url_suffix, links)
+
             print(f"Returning links")
             return links
 
@@ -130,13 +164,14 @@ class WikiGameCrawler:
             return False
 
         previous_url = self.driver.current_url
+        click_start = self.scheduler.clock()
 
         success = False
         for i in range(RETRIES):
             try:
                 print(f"Retrieving hyperlink for {link}")
                 locator = (By.XPATH, f"//a[contains(@href, '/wiki/{link.url_prefix}')]")
-                element = WebDriverWait(self.driver, TIMEOUT, ignored_exceptions=IGNORED_EXCEPTIONS).until(
+                element = self._wait(ignored_exceptions=IGNORED_EXCEPTIONS).until(
                     presence_of_element_located(locator) and element_to_be_clickable(locator))
 
                 print(f"Clicking hyperlink...")
@@ -147,7 +182,7 @@ class WikiGameCrawler:
             except Exception as ex:
                 print(f"Unable to click hyperlink: {ex}")
 
-            sleep(RETRY_DELAY)
+            sleep(self.retry_delay)
 
         if not success:
             return False
@@ -155,17 +190,46 @@ class WikiGameCrawler:
         success = False
         for i in range(RETRIES):
             try:
-                WebDriverWait(self.driver, TIMEOUT).until(url_changes(previous_url))
+                self._wait().until(url_changes(previous_url))
                 print(f"URL: {self.driver.current_url}")
                 success = True
                 break
             except Exception as ex:
-                sleep(RETRY_DELAY)
+                sleep(self.retry_delay)
 
         if not success:
             return False
 
+        self.scheduler.measure(self.scheduler.clock() - click_start)
         self.current = link.title
+        self.path.append(link.url_prefix)
+
+        if self.path_cache and normalize_url_prefix(link.url_prefix) == normalize_url_prefix(self.goal):
+            self.path_cache.add_path(self.path)
+
+        return True
+
+    def replay_cached_path(self) -> bool:
+        """ Follow a verified path from the current page to the goal, if one is known. """
+        if not self.path_cache or not self.path:
+            return False
+
+        path = self.path_cache.get_path(self.path[-1], self.goal)
+        if not path:
+            return False
+
+        print(f"Replaying cached path: {path}")
+        for page, next_page in zip(path, path[1:]):
+            if self.is_game_over:
+                break
+
+            title = normalize_url_prefix(next_page).replace("_", " ")
+            link = Link(title, title, f"{BASE_URL}/wiki/{next_page}")
+            if not self.click(link):
+                print(f"Cached path is broken at {link}")
+                self.path_cache.remove_link(page, next_page, self.goal)
+                return False
+
         return True
 
     def back(self):
@@ -177,14 +241,17 @@ class WikiGameCrawler:
             previous_url = self.driver.current_url
             self.driver.back()
 
+            if len(self.path) > 1:
+                self.path.pop()
+
             for i in range(RETRIES):
                 try:
-                    WebDriverWait(self.driver, TIMEOUT).until(url_changes(previous_url))
+                    self._wait().until(url_changes(previous_url))
                     print(f"Back to URL: {self.driver.current_url}")
                     break
                 except Exception as ex:
                     pass
-                sleep(RETRY_DELAY)
+                sleep(self.retry_delay)
 
         except Exception as ex:
             print(f"Failed to go back: {ex}")
@@ -233,16 +300,16 @@ class WikiGameCrawler:
                     break
             except Exception:
                 print("Unable to click start game button...")
-            sleep(RETRY_DELAY)
+            sleep(self.retry_delay)
 
         for i in range(RETRIES):
             try:
-                WebDriverWait(self.driver, TIMEOUT).until(url_changes(previous_url))
+                self._wait().until(url_changes(previous_url))
                 print(f"URL: {self.driver.current_url}")
                 break
             except Exception as ex:
                 pass
-            sleep(RETRY_DELAY)
+            sleep(self.retry_delay)
 
     def get_name_input(self):
         script = """
@@ -0,0 +1,97 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple, Type
+
+import numpy as np
+
+
+class Encoder(ABC):
+    """
+    Backend turning texts into embeddings for the SimilarityRanker, selected by the encoder key in config.yaml.
+
+    Every backend is created from the language_model_name in config.yaml, backends without a model ignore it.
+    """
+
+    @abstractmethod
+    def __init__(self, model_name: str):
+        pass
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        pass
+
+
+class SentenceTransformerEncoder(Encoder):
+    """
+    Full precision Sentence Transformer, most accurate but also the slowest and largest backend.
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, show_progress_bar=False)
+
+
+class QuantizedSentenceTransformerEncoder(SentenceTransformerEncoder):
+    """
+    Sentence Transformer with its linear layers dynamically quantized to int8, for faster inference on CPU.
+    """
+
+    def __init__(self, model_name: str):
+        import torch
+        super().__init__(model_name)
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class HashingEncoder(Encoder):
+    """
+    Hashes the byte n-grams of every text into a fixed number of dimensions, without any language model.
+
+    All texts are encoded at once: the n-gram windows of the concatenated texts are hashed with numpy,
+    windows crossing the separator between two texts are dropped.
+    """
+
+    def __init__(self, model_name: str = "", dimension_bits: int = 10, ngram_range: Tuple[int, int] = (2, 4)):
+        self.dimension_bits = dimension_bits
+        self.ngram_range = ngram_range
+        self.multipliers = np.random.default_rng(0).integers(1, 2 ** 63, ngram_range[1], dtype=np.uint64) | 1
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        num_dimensions = 1 << self.dimension_bits
+        data = "\0".join(f" {text.replace('_', ' ').lower()} " for text in texts).encode()
+        data = np.frombuffer(data, dtype=np.uint8)
+        rows = np.cumsum(data == 0)
+
+        indices = []
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            if len(data) < n:
+                continue
+            windows = np.lib.stride_tricks.sliding_window_view(data, n)
+            valid = (windows != 0).all(axis=1)
+            hashes = (windows[valid].astype(np.uint64) * self.multipliers[:n]).sum(axis=1, dtype=np.uint64)
+            columns = (hashes * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(64 - self.dimension_bits)
+            indices.append(rows[:len(valid)][valid] * num_dimensions + columns.astype(np.int64))
+
+        counts = np.bincount(np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                             minlength=len(texts) * num_dimensions)
+        embeddings = counts.reshape(len(texts), num_dimensions).astype(np.float32)
+        return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+ENCODERS: Dict[str, Type[Encoder]] = {
+    "sentence_transformer": SentenceTransformerEncoder,
+    "quantized_sentence_transformer": QuantizedSentenceTransformerEncoder,
+    "hashing": HashingEncoder,
+}
+
+
+def create_encoder(name: str, model_name: str) -> Encoder:
+    if name not in ENCODERS:
+        raise ValueError(f"Invalid encoder {name}, choose from {', '.join(ENCODERS)}")
+    return ENCODERS[name](model_name)
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
@@ -0,0 +1,100 @@
+import json
+from heapq import heappop, heappush
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from wiki_game_ai.database.connection import PostgresConnection
+from wiki_game_ai.database.data_provider import get_pages
+from wiki_game_ai.encoders import normalize
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.scheduler import Deadline
+from wiki_game_ai.similarity import SimilarityRanker
+
+MAX_PAGES = 100
+MAX_LINKS = 250
+MAX_BREADTH = 3
+BATCH_SIZE = 5
+ARRAYS = ("indptr", "indices", "embeddings")
+
+
+class LinkGraph:
+    """
+    Read-only snapshot of the Wikipedia link graph around a page, using reference data from the Postgres Database.
+
+    Pages are expanded best first by similarity to the goal, keeping only the max_breadth most similar links of every
+    page: the links a search following the same rule actually reaches. At most max_links links of a page are ranked,
+    and the expansion stops early at the deadline, so building the graph fits in the time budget of a move.
+
+    The links are stored as a CSR adjacency list (indptr, indices) over page ids, next to a matrix of normalized title
+    embeddings. The arrays are saved as .npy files, so worker processes can memory-map them instead of copying them.
+    """
+
+    def __init__(self, titles: List[str], indptr: np.ndarray, indices: np.ndarray, embeddings: np.ndarray):
+        self.titles = titles
+        self.ids = {title: page_id for page_id, title in enumerate(titles)}
+        self.indptr = indptr
+        self.indices = indices
+        self.embeddings = embeddings
+
+    def __len__(self):
+        return len(self.titles)
+
+    def links(self, page_id: int) -> np.ndarray:
+        return self.indices[self.indptr[page_id]:self.indptr[page_id + 1]]
+
+    def is_expanded(self, title: str) -> bool:
+        return title in self.ids and self.indptr[self.ids[title] + 1] > self.indptr[self.ids[title]]
+
+    def similarities(self, page_ids: Sequence[int], goal_id: int) -> np.ndarray:
+        return self.embeddings[page_ids] @ self.embeddings[goal_id]
+
+    def save(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "titles.json").write_text(json.dumps(self.titles))
+        for name in ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: Path) -> "LinkGraph":
+        titles = json.loads((directory / "titles.json").read_text())
+        return cls(titles, *(np.load(directory / f"{name}.npy", mmap_mode="r") for name in ARRAYS))
+
+    @classmethod
+    def build(cls, connection: PostgresConnection, ranker: SimilarityRanker, start: str, goal: str,
+              max_pages: int = MAX_PAGES, max_links: int = MAX_LINKS, max_breadth: int = MAX_BREADTH,
+              link_store: Optional[LinkStore] = None, deadline: Optional[Deadline] = None) -> "LinkGraph":
+        titles = [start, goal] if start != goal else [start]
+        ids = {title: page_id for page_id, title in enumerate(titles)}
+        adjacency = {}
+        goal_embedding = normalize(ranker.encode([goal]))[0]
+
+        # Best first expansion from the start page, the goal page itself never needs to be expanded
+        heap = [(-1.0, start)]
+        while heap and len(adjacency) < max_pages and not (adjacency and deadline and deadline.expired):
+            batch = [heappop(heap)[1] for _ in range(min(len(heap), BATCH_SIZE, max_pages - len(adjacency)))]
+            for page in get_pages(connection, batch):
+                if link_store:
+                    page = link_store.correct(page)
+                links = [link for link in dict.fromkeys(page.links) if 'disambiguation' not in link][:max_links]
+                if not links:
+                    adjacency[page.title] = []
+                    continue
+
+                similarities = normalize(ranker.encode(links)) @ goal_embedding
+                best_links = np.argsort(similarities)[::-1][:max_breadth]
+                adjacency[page.title] = [links[i] for i in best_links]
+                for i in best_links:
+                    if links[i] not in ids:
+                        ids[links[i]] = len(titles)
+                        titles.append(links[i])
+                        heappush(heap, (-float(similarities[i]), links[i]))
+
+        indptr = np.zeros(len(titles) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(adjacency.get(title, ())) for title in titles])
+        indices = np.fromiter((ids[link] for title in titles for link in adjacency.get(title, ())),
+                              dtype=np.int32, count=int(indptr[-1]))
+
+        return cls(titles, indptr, indices, normalize(ranker.encode(titles)))
+
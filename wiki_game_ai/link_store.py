@@ -0,0 +1,117 @@
+import sqlite3
+import zlib
+from array import array
+from pathlib import Path
+from time import time
+from typing import List, Optional, Sequence, Set, Tuple
+
+from wiki_game_ai.config import CACHE_DIRECTORY, CONFIG
+from wiki_game_ai.models import Link, Page, normalize_url_prefix
+
+MAX_AGE = CONFIG.get("link_store_max_age", 7 * 24 * 60 * 60)
+
+
+class LinkStore:
+    """
+    Persistent store of the links observed on TheWikiGame per article, stored in SQLite.
+
+    Every observation is kept with its timestamp. Links are stored once in the link table, an observation only holds
+    the zlib compressed, delta encoded list of their ids. Pages are identified by their normalized url prefix, so the
+    url suffix of the browser and the title of the reference data refer to the same page.
+    """
+
+    def __init__(self, filename: Path = CACHE_DIRECTORY / "link_store.sqlite"):
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(filename))
+        with self.connection:
+            self.connection.execute("""
+                create table if not exists link (id integer primary key, href text unique, title text, text text)
+            """)
+            self.connection.execute("""
+                create table if not exists observation (page text, timestamp real, links blob)
+            """)
+            self.connection.execute("""
+                create index if not exists observation_page on observation (page, timestamp)
+            """)
+
+    def add(self, page: str, links: Sequence[Link], timestamp: Optional[float] = None):
+        page = normalize_url_prefix(page)
+        with self.connection:
+            self.connection.executemany("insert or ignore into link (href, title, text) values (?, ?, ?)",
+                                        [(link.href, link.title, link.text) for link in links])
+            ids = [self._get_id(link.href) for link in links]
+            self.connection.execute("insert into observation values (?, ?, ?)",
+                                    (page, timestamp or time(), compress(ids)))
+
+    def get(self, page: str, max_age: Optional[float] = MAX_AGE) -> Optional[List[Link]]:
+        """ Links of the latest observation of the page, or None if it has not been observed in max_age seconds. """
+        observation = self._get_latest(page)
+        if not observation or (max_age is not None and time() - observation[0] > max_age):
+            return None
+        return self._get_links(decompress(observation[1]))
+
+    def get_url_prefixes(self, page: str) -> Set[str]:
+        links = self.get(page, max_age=None)
+        return {link.url_prefix for link in links} if links else set()
+
+    def get_history(self, page: str) -> List[Tuple[float, List[Link]]]:
+        rows = self.connection.execute("select timestamp, links from observation where page = ? order by timestamp",
+                                       (normalize_url_prefix(page),)).fetchall()
+        return [(timestamp, self._get_links(decompress(links))) for timestamp, links in rows]
+
+    def get_titles(self) -> List[str]:
+        return [title for title, in self.connection.execute("select distinct title from link order by title")]
+
+    def remove_link(self, page: str, url_prefix: str):
+        """ Drop a link that could not be clicked from the latest observation of the page. """
+        page = normalize_url_prefix(page)
+        observation = self._get_latest(page)
+        if not observation:
+            return
+
+        timestamp, data = observation
+        ids = decompress(data)
+        ids = [id_ for id_, link in zip(ids, self._get_links(ids))
+               if normalize_url_prefix(link.url_prefix) != normalize_url_prefix(url_prefix)]
+        with self.connection:
+            self.connection.execute("update observation set links = ? where page = ? and timestamp = ?",
+                                    (compress(ids), page, timestamp))
+
+    def correct(self, page: Page) -> Page:
+        """ Remove links from the reference data that were not on the last observed WikiGame page. """
+        if url_prefixes := {normalize_url_prefix(url_prefix) for url_prefix in self.get_url_prefixes(page.title)}:
+            page.links = [link for link in page.links if normalize_url_prefix(link) in url_prefixes]
+        return page
+
+    def _get_id(self, href: str) -> int:
+        return self.connection.execute("select id from link where href = ?", (href,)).fetchone()[0]
+
+    def _get_latest(self, page: str) -> Optional[Tuple[float, bytes]]:
+        return self.connection.execute(
+            "select timestamp, links from observation where page = ? order by timestamp desc limit 1",
+            (normalize_url_prefix(page),)).fetchone()
+
+    def _get_links(self, ids: Sequence[int]) -> List[Link]:
+        links = {}
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            rows = self.connection.execute(
+                f"select id, title, text, href from link where id in ({','.join('?' * len(batch))})", batch)
+            links.update({id_: Link(title, text, href) for id_, title, text, href in rows})
+        return [links[id_] for id_ in ids]
+
+
+def compress(ids: Sequence[int]) -> bytes:
+    """ The ids in page order, delta encoded against the previous id: links first seen together get consecutive ids. """
+    deltas = array("i", (current - previous for previous, current in zip([0, *ids], ids)))
+    return zlib.compress(deltas.tobytes())
+
+
+def decompress(data: bytes) -> List[int]:
+    deltas = array("i")
+    deltas.frombytes(zlib.decompress(data))
+    ids, total = [], 0
+    for delta in deltas:
+        total += delta
+        ids.append(total)
+    return ids
@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from typing import List
+from urllib.parse import unquote
 
 
 @dataclass
@@ -23,3 +24,8 @@ class Link:
 
     def __str__(self):
         return f"Link(title=\"{self.title}\", url_prefix=\"{self.url_prefix}\")"
+
+
+def normalize_url_prefix(url_prefix: str) -> str:
+    """ Decodes the escaped characters of a url prefix and replaces spaces, so it compares equal to the title. """
+    return unquote(url_prefix).replace(" ", "_")
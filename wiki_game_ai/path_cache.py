@@ -0,0 +1,90 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from wiki_game_ai.config import CACHE_DIRECTORY
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.models import normalize_url_prefix
+
+
+class PathCache:
+    """
+    Persistent cache of verified click sequences on TheWikiGame, stored in SQLite.
+
+    Every suffix of a verified path is stored by (page, goal), so a round can be replayed from its start as well as
+    from any page on a known path. Using the links observed in the LinkStore, a path is also found from a page
+    linking to such a page. Pages and goals are keyed by their normalized url prefix, while the paths keep the url
+    prefixes as they were clicked.
+    """
+
+    def __init__(self, link_store: Optional[LinkStore] = None,
+                 filename: Path = CACHE_DIRECTORY / "path_cache.sqlite"):
+        self.link_store = link_store
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(filename))
+        with self.connection:
+            self.connection.execute("""
+                create table if not exists path (
+                    page text, goal text, path text, length integer, primary key (page, goal)
+                )
+            """)
+
+    def add_path(self, path: Sequence[str]):
+        path = remove_cycles(path)
+        goal = normalize_url_prefix(path[-1])
+        with self.connection:
+            self.connection.executemany("""
+                insert into path values (?, ?, ?, ?)
+                on conflict (page, goal) do update set path = excluded.path, length = excluded.length
+                where excluded.length < path.length
+            """, [(normalize_url_prefix(path[i]), goal, json.dumps(path[i:]), len(path) - i)
+                  for i in range(len(path) - 1)])
+
+    def get_path(self, page: str, goal: str) -> Optional[List[str]]:
+        page, goal = normalize_url_prefix(page), normalize_url_prefix(goal)
+        row = self.connection.execute("select path from path where page = ? and goal = ?", (page, goal)).fetchone()
+        if row:
+            return json.loads(row[0])
+
+        # Overlapping rounds: a known path starting from one of the links on this page
+        links = self.link_store.get_url_prefixes(page) if self.link_store else set()
+        links = {normalize_url_prefix(link): link for link in links}
+        for next_page, path in self.connection.execute(
+                "select page, path from path where goal = ? order by length", (goal,)):
+            if next_page in links:
+                return [page] + json.loads(path)
+
+        return None
+
+    def remove_link(self, page: str, link: str, goal: str):
+        """
+        Remove all paths towards the goal that contain the given (broken) click.
+
+        When no path contains it, the click was the first hop of an overlapping route, taken from a stale observation
+        in the LinkStore. The link is dropped from that observation instead.
+        """
+        click = (normalize_url_prefix(page), normalize_url_prefix(link))
+        goal = normalize_url_prefix(goal)
+        broken = []
+        for start, path in self.connection.execute("select page, path from path where goal = ?", (goal,)).fetchall():
+            path = [normalize_url_prefix(x) for x in json.loads(path)]
+            if click in zip(path, path[1:]):
+                broken.append((start, goal))
+
+        if not broken and self.link_store:
+            self.link_store.remove_link(page, link)
+
+        with self.connection:
+            self.connection.executemany("delete from path where page = ? and goal = ?", broken)
+
+
+def remove_cycles(path: Sequence[str]) -> List[str]:
+    result, pages = [], []
+    for page in path:
+        if (normalized := normalize_url_prefix(page)) in pages:
+            index = pages.index(normalized)
+            result, pages = result[:index], pages[:index]
+        result.append(page)
+        pages.append(normalized)
+    return result
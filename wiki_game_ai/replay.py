@@ -0,0 +1,250 @@
+import gzip
+import json
+from collections import defaultdict
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from selenium.common import exceptions
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.remote.webelement import WebElement
+
+from wiki_game_ai.crawler import WikiGameCrawler
+from wiki_game_ai.scheduler import MoveScheduler
+
+DRIVER = "driver"
+REPLAY_POLL_FREQUENCY = 1e-4
+MAX_MISMATCHES = 1000
+
+Target = Union[str, int]
+
+
+class RecordingExhausted(BaseException):
+    """
+    Raised when every recorded interaction has been replayed.
+
+    Derives from BaseException, so it passes the broad exception handlers of the crawler and ends the replayed session.
+    """
+
+
+class RecordingDiverged(BaseException):
+    """
+    Raised when the replayed session keeps making calls that are not in the recording.
+    """
+
+
+class Recorder:
+    """
+    Writes every driver and element interaction, with its result and duration, to a gzipped JSON lines file.
+
+    Web elements are replaced by an id, so the interactions with them can be matched on replay. The first line is a
+    header with the seed of the random choices made by the strategies during the game.
+    """
+
+    def __init__(self, filename: Path, seed: int):
+        self.file = gzip.open(filename, "wt")
+        self.file.write(json.dumps({"seed": seed}) + "\n")
+        self.element_ids = {}
+
+    def record(self, target: Target, kind: str, name: str, args: List[Any], result: Any = None,
+               error: Optional[Exception] = None, duration: float = 0.0):
+        event = {"target": target, "kind": kind, "name": name, "args": args, "result": result,
+                 "error": [type(error).__name__, str(error)] if error else None, "duration": duration}
+        self.file.write(json.dumps(event) + "\n")
+
+    def wrap(self, value: Any) -> Any:
+        """ Returns the JSON encoded value and the value with its elements wrapped in recording proxies. """
+        if isinstance(value, WebElement):
+            element_id = self.element_ids.setdefault(value.id, len(self.element_ids))
+            return {"element": element_id}, RecordingProxy(value, element_id, self)
+        if isinstance(value, (list, tuple)):
+            pairs = [self.wrap(x) for x in value]
+            return [encoded for encoded, _ in pairs], [wrapped for _, wrapped in pairs]
+        if isinstance(value, dict):
+            pairs = {key: self.wrap(x) for key, x in value.items()}
+            return {key: encoded for key, (encoded, _) in pairs.items()}, \
+                {key: wrapped for key, (_, wrapped) in pairs.items()}
+        return value, value
+
+    def close(self):
+        self.file.close()
+
+
+class RecordingProxy:
+    def __init__(self, target: Any, target_id: Target, recorder: Recorder):
+        self._target = target
+        self._target_id = target_id
+        self._recorder = recorder
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        start = perf_counter()
+        try:
+            value = getattr(self._target, name)
+        except Exception as ex:
+            self._recorder.record(self._target_id, "get", name, [], error=ex, duration=perf_counter() - start)
+            raise
+
+        if not callable(value):
+            encoded, wrapped = self._recorder.wrap(value)
+            self._recorder.record(self._target_id, "get", name, [], encoded, duration=perf_counter() - start)
+            return wrapped
+
+        def _call(*args):
+            args = [arg._target if isinstance(arg, RecordingProxy) else arg for arg in args]
+            encoded_args, _ = self._recorder.wrap(args)
+            call_start = perf_counter()
+            try:
+                result = value(*args)
+            except Exception as ex:
+                self._recorder.record(self._target_id, "call", name, encoded_args, error=ex,
+                                      duration=perf_counter() - call_start)
+                raise
+            encoded, wrapped = self._recorder.wrap(result)
+            self._recorder.record(self._target_id, "call", name, encoded_args, encoded,
+                                  duration=perf_counter() - call_start)
+            return wrapped
+
+        return _call
+
+
+class RecordingDriver(RecordingProxy):
+    """
+    Wraps a live web driver and records every interaction with it during a real game.
+    """
+
+    def __init__(self, driver: Any, filename: Path, seed: int):
+        super().__init__(driver, DRIVER, Recorder(filename, seed))
+
+    def close_recording(self):
+        self._recorder.close()
+
+
+class Replay:
+    """
+    Feeds recorded interactions back in their original order.
+
+    A call that is not the next recorded interaction was not made at that point of the recorded game, which happens
+    when a wait polls faster than it did while recording. It raises a TimeoutException, as the recorded wait did.
+
+    The clock only advances by the recorded duration of every replayed interaction, so the time budgets of the moves
+    do not depend on the speed of the replay.
+    """
+
+    def __init__(self, filename: Path):
+        self.seed, self.events = load_events(filename)
+        self.properties = {(event["target"] == DRIVER, event["name"])
+                           for event in self.events if event["kind"] == "get"}
+        self.cursor = 0
+        self.elapsed = 0.0
+        self.mismatches = 0
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def is_property(self, target: Target, name: str) -> bool:
+        return (target == DRIVER, name) in self.properties
+
+    def peek(self, target: Target, kind: str, name: str) -> bool:
+        if self.cursor >= len(self.events):
+            raise RecordingExhausted(f"All {len(self.events)} recorded interactions have been replayed")
+        event = self.events[self.cursor]
+        return (event["target"], event["kind"], event["name"]) == (target, kind, name)
+
+    def next(self, target: Target, kind: str, name: str, args: List[Any]) -> Any:
+        if not self.peek(target, kind, name) or self.events[self.cursor]["args"] != encode(args):
+            self.mismatches += 1
+            if self.mismatches > MAX_MISMATCHES:
+                raise RecordingDiverged(f"Replay diverged from the recording at interaction {self.cursor}")
+            raise TimeoutException(f"{name} is not recorded at interaction {self.cursor}")
+
+        event = self.events[self.cursor]
+        self.cursor += 1
+        self.mismatches = 0
+        self.elapsed += event["duration"]
+        self.durations[name] += event["duration"]
+        self.counts[name] += 1
+
+        if event["error"]:
+            error_type, message = event["error"]
+            error_class = getattr(exceptions, error_type, None)
+            if not isinstance(error_class, type) or not issubclass(error_class, Exception):
+                error_class = WebDriverException
+            raise error_class(message)
+        return self.unwrap(event["result"])
+
+    def clock(self) -> float:
+        return self.elapsed
+
+    def unwrap(self, value: Any) -> Any:
+        if isinstance(value, dict) and set(value) == {"element"}:
+            return ReplayProxy(value["element"], self)
+        if isinstance(value, list):
+            return [self.unwrap(x) for x in value]
+        if isinstance(value, dict):
+            return {key: self.unwrap(x) for key, x in value.items()}
+        return value
+
+
+class ReplayProxy:
+    def __init__(self, target_id: Target, replay: Replay):
+        self._target_id = target_id
+        self._replay = replay
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+
+        if self._replay.is_property(self._target_id, name):
+            return self._replay.next(self._target_id, "get", name, [])
+        return lambda *args: self._replay.next(self._target_id, "call", name, list(args))
+
+
+class ReplayDriver(ReplayProxy):
+    """
+    Replaces the web driver with a recording, so the crawler and strategies can run offline at full speed.
+    """
+
+    def __init__(self, filename: Path):
+        super().__init__(DRIVER, Replay(filename))
+
+    @property
+    def replay(self) -> Replay:
+        return self._replay
+
+
+def encode(value: Any) -> Any:
+    if isinstance(value, (RecordingProxy, ReplayProxy)):
+        return {"element": value._target_id}
+    if isinstance(value, (list, tuple)):
+        return [encode(x) for x in value]
+    if isinstance(value, dict):
+        return {key: encode(x) for key, x in value.items()}
+    return value
+
+
+def load_events(filename: Path) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """ The seed from the header and the recorded interactions. """
+    seed, events = None, []
+    with gzip.open(filename, "rt") as file:
+        try:
+            for line in file:
+                event = json.loads(line)
+                if "target" in event:
+                    events.append(event)
+                else:
+                    seed = event["seed"]
+        except (EOFError, json.JSONDecodeError):
+            # The recording was interrupted, keep the interactions written until then
+            pass
+    return seed, events
+
+
+def create_replay_crawler(filename: Path) -> WikiGameCrawler:
+    driver = ReplayDriver(filename)
+    crawler = WikiGameCrawler(driver_factory=lambda: driver)
+    crawler.scheduler = MoveScheduler(clock=driver.replay.clock)
+    crawler.poll_frequency = REPLAY_POLL_FREQUENCY
+    crawler.retry_delay = 0
+    return crawler
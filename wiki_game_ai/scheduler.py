@@ -0,0 +1,82 @@
+from time import monotonic
+from typing import Callable, Iterable, Optional, TypeVar
+
+from wiki_game_ai.config import CONFIG
+
+ROUND_DURATION = CONFIG.get("round_duration", 120)
+MAX_MOVE_TIME = CONFIG.get("max_move_time", 10)
+EXPECTED_MOVES = 5
+INITIAL_LATENCY = 1.0
+LATENCY_DECAY = 0.8
+
+T = TypeVar("T")
+
+
+class Deadline:
+    def __init__(self, seconds: float, clock: Callable[[], float] = monotonic):
+        self.clock = clock
+        self.end = clock() + seconds
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.end - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.clock() >= self.end
+
+    def __str__(self):
+        return f"Deadline(remaining={self.remaining:.2f})"
+
+
+class MoveScheduler:
+    """
+    Sets the time budget of every move from the remaining time in the round and the measured browser latency.
+
+    Time is reserved for the clicks still expected to be needed, the rest is spread over those moves. Every click made
+    in the round lowers the number of expected moves, down to one.
+
+    The round is timed with a local clock from the start of the game, as TheWikiGame shows its timer in an element
+    that is not part of the crawled page. The round_duration should therefore match the group settings.
+    A replayed game passes the clock of its recording instead.
+    """
+
+    def __init__(self, round_duration: float = ROUND_DURATION, max_move_time: float = MAX_MOVE_TIME,
+                 expected_moves: int = EXPECTED_MOVES, clock: Callable[[], float] = monotonic):
+        self.round_duration = round_duration
+        self.max_move_time = max_move_time
+        self.expected_moves = expected_moves
+        self.clock = clock
+        self.latency = INITIAL_LATENCY
+        self.round_start = clock()
+        self.num_moves = 0
+
+    def new_round(self):
+        self.round_start = self.clock()
+        self.num_moves = 0
+
+    def measure(self, latency: float):
+        """ Update the latency estimate with a click that was just made. """
+        self.latency = LATENCY_DECAY * self.latency + (1 - LATENCY_DECAY) * latency
+        self.num_moves += 1
+
+    @property
+    def moves_left(self) -> int:
+        return max(1, self.expected_moves - self.num_moves)
+
+    @property
+    def remaining_time(self) -> float:
+        return max(0.0, self.round_duration - (self.clock() - self.round_start))
+
+    def deadline(self) -> Deadline:
+        spare_time = self.remaining_time - self.moves_left * self.latency
+        return Deadline(max(0.0, min(self.max_move_time, spare_time / self.moves_left)), self.clock)
+
+    @staticmethod
+    def decide(search: Iterable[T], deadline: Deadline) -> Optional[T]:
+        """ Take refinements of the best move from an anytime search until the deadline, and commit to the last. """
+        best = None
+        for best in search:
+            if deadline.expired:
+                break
+        return best
@@ -1,17 +1,38 @@
 from typing import List, Tuple
 
+import numpy as np
 from scipy.spatial.distance import cdist
-from sentence_transformers import SentenceTransformer
 
 from wiki_game_ai.config import CONFIG
+from wiki_game_ai.encoders import Encoder, create_encoder
 
-SENTENCE_TRANSFORMER = SentenceTransformer(CONFIG['language_model_name'])
+ENCODER_NAME = CONFIG.get('encoder', 'sentence_transformer')
+ENCODER = create_encoder(ENCODER_NAME, CONFIG['language_model_name'])
+
+_ENCODERS = {ENCODER_NAME: ENCODER}
+
+
+def get_encoder(name: str) -> Encoder:
+    if name not in _ENCODERS:
+        _ENCODERS[name] = create_encoder(name, CONFIG['language_model_name'])
+    return _ENCODERS[name]
 
 
 class SimilarityRanker:
-    def __init__(self):
+    """
+    Ranks texts by the cosine similarity of their embeddings, which are cached per text.
+
+    The encoder is kept at module level and only referred to by name, so a ranker is pickled without its model.
+    """
+
+    def __init__(self, encoder_name: str = ENCODER_NAME):
+        self.encoder_name = encoder_name
         self.cache = {}
 
+    @property
+    def encoder(self) -> Encoder:
+        return get_encoder(self.encoder_name)
+
     def sorted(self, data: List[str], reference: str) -> List[Tuple[str, float]]:
         return sorted(zip(data, self._get_similarities(data, reference)), key=lambda x: x[1], reverse=True)
 
@@ -21,14 +42,21 @@ class SimilarityRanker:
     def get_similarity(self, data: str, reference: str) -> Tuple[str, float]:
         return self._get_similarities([data], reference)
 
+    def encode(self, data: List[str]) -> np.ndarray:
+        self._update_cache(data)
+        return np.array([self.cache[x] for x in data])
+
+    def _update_cache(self, data: List[str]):
+        not_in_cache = list({x: None for x in data if x not in self.cache})
+        if not_in_cache:
+            embeddings = self.encoder.encode(not_in_cache)
+            self.cache.update({text: embedding for text, embedding in zip(not_in_cache, embeddings)})
+
     def _get_similarities(self, data: List[str], reference: str):
         if not data:
             return []
 
-        not_in_cache = [x for x in data + [reference] if x not in self.cache]
-        if not_in_cache:
-            embeddings = SENTENCE_TRANSFORMER.encode(not_in_cache, show_progress_bar=False)
-            self.cache.update({text: embedding for text, embedding in zip(not_in_cache, embeddings)})
+        self._update_cache(data + [reference])
 
         embeddings = [self.cache[x] for x in data]
         distances = cdist([self.cache[reference]], embeddings, "cosine")[0]
@@ -5,6 +5,7 @@ from time import sleep
 from wiki_game_ai.config import CONFIG
 from wiki_game_ai.crawler import WikiGameCrawler
 from wiki_game_ai.similarity import SimilarityRanker
+from wiki_game_ai.strategies.lookahead import refine
 
 BOT_NAME = Path(__file__).stem.title() + "_Bot"
 GROUP_CODE = CONFIG.get("group_code", None)
@@ -26,9 +27,15 @@ def run(crawler: WikiGameCrawler, ranker: SimilarityRanker):
         visited = set()
 
         while not crawler.is_game_over:
+            if crawler.replay_cached_path():
+                continue
+
             if links := crawler.get_links():
+                deadline = crawler.scheduler.deadline()
                 data = [link.title for link in links]
                 results = ranker.sorted(data, crawler.goal)
+                results = crawler.scheduler.decide(refine(ranker, crawler.link_store, results, links, crawler.goal),
+                                                   deadline)
 
                 print(f"Top 10:")
                 for result in results[:10]:
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
 
 from tqdm import tqdm
 
@@ -7,7 +7,9 @@ from wiki_game_ai.config import CONFIG
 from wiki_game_ai.crawler import WikiGameCrawler
 from wiki_game_ai.database.connection import PostgresConnection
 from wiki_game_ai.database.data_provider import get_pages
-from wiki_game_ai.models import Page
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.models import Page, normalize_url_prefix
+from wiki_game_ai.scheduler import Deadline
 from wiki_game_ai.similarity import SimilarityRanker
 
 BOT_NAME = Path(__file__).stem.title() + "_Bot"
@@ -24,25 +26,35 @@ class Iddfs:
 
     Unfortunately, the Wikipedia pages contain much more information than the pages from TheWikiGame,
     resulting in a lot of overhead and backtracking.
+
+    Without a crawler only the reference data is searched, the start and goal pages are then set by the caller.
     """
 
-    def __init__(self, crawler: WikiGameCrawler, ranker: SimilarityRanker):
+    def __init__(self, crawler: Optional[WikiGameCrawler], ranker: SimilarityRanker,
+                 connection: PostgresConnection = CONNECTION, link_store: Optional[LinkStore] = None):
         self.crawler = crawler
         self.ranker = ranker
-        self.start, self.goal = get_pages(CONNECTION, [crawler.start, crawler.goal])
+        self.connection = connection
+        self.link_store = link_store or (crawler.link_store if crawler else None)
         self.page_cache = {}
+        self.start, self.goal = self.get_pages([crawler.start, crawler.goal]) if crawler else (None, None)
         self.solutions = []
+        self.deadline = None
+
+    def solve(self, max_breadth: int, max_depth: int, deadline: Optional[Deadline] = None) -> Iterable[List[str]]:
+        self.deadline = deadline
 
-    def solve(self, max_breadth: int, max_depth: int) -> Iterable[List[str]]:
+        # Deepest remaining depth searched per page, kept across iterations
+        transpositions = {}
         for _max_depth in tqdm(range(1, max_depth)):
-            if self.crawler.is_game_over:
+            if self.is_stopped():
                 return
 
-            path, visited = [self.start.title], {}
-            yield from self.solve_for_depth(self.start, 0, max_breadth, _max_depth, visited, path)
+            path = [self.start.title]
+            yield from self.solve_for_depth(self.start, _max_depth, max_breadth, transpositions, path)
 
-    def solve_for_depth(self, page: Page, depth: int, max_breadth: int, max_depth: int,
-                        visited: Dict[str, int], path: List[str]) -> Iterable[List[str]]:
+    def solve_for_depth(self, page: Page, depth: int, max_breadth: int,
+                        transpositions: Dict[str, int], path: List[str]) -> Iterable[List[str]]:
         if self.goal.title in page.links:
             solution = path + [self.goal.title]
             if solution not in self.solutions:
@@ -50,51 +62,95 @@ class Iddfs:
                 yield solution
             return
 
-        if visited.get(page.title, float('inf')) <= depth:
+        if transpositions.get(page.title, -1) >= depth:
             return
 
-        visited[page.title] = depth
+        transpositions[page.title] = depth
 
-        if self.crawler.is_game_over or depth >= max_depth:
+        if self.is_stopped() or depth <= 0:
             return
 
+        for next_page in self.get_pages(self.get_best_links(page, max_breadth)):
+            yield from self.solve_for_depth(next_page, depth - 1, max_breadth,
+                                            transpositions, path + [next_page.title])
+
+    def is_stopped(self) -> bool:
+        return bool(self.crawler and self.crawler.is_game_over) or bool(self.deadline and self.deadline.expired)
+
+    def get_best_links(self, page: Page, max_breadth: int) -> List[str]:
         links = list(set(link for link in page.links if 'disambiguation' not in link))[:MAX_PAGES]
-        best_links = [title for title, score in self.ranker.sorted(links, self.goal.title)][:max_breadth]
-        for next_page in self.get_pages(best_links):
-            yield from self.solve_for_depth(next_page, depth + 1, max_breadth, max_depth,
-                                            visited, path + [next_page.title])
+        return [title for title, score in self.ranker.sorted(links, self.goal.title)][:max_breadth]
 
     def get_pages(self, titles: Sequence[str]) -> Iterable[Page]:
         titles_not_in_cache = [title for title in titles if title not in self.page_cache]
-        self.page_cache.update({page.title: page for page in get_pages(CONNECTION, titles_not_in_cache)})
+        pages = get_pages(self.connection, titles_not_in_cache)
+        if self.link_store:
+            pages = [self.link_store.correct(page) for page in pages]
+        self.page_cache.update({page.title: page for page in pages})
         return (self.page_cache[title] for title in titles)
 
     def fix_links(self):
         # Remove links from reference data that are not on WikiGame
         links = self.crawler.get_links()
-        url_prefixes = {link.url_prefix for link in links}
-        page, = self.get_pages([self.crawler.url_suffix])
-        page.links = [link for link in page.links if link in url_prefixes]
+        url_prefixes = {normalize_url_prefix(link.url_prefix) for link in links}
+        page, = self.get_pages([normalize_url_prefix(self.crawler.url_suffix)])
+        page.links = [link for link in page.links if normalize_url_prefix(link) in url_prefixes]
+
+    def commit_best_link(self):
+        # Out of time without a solution, click the best ranked link not visited yet and continue searching from there
+        visited = {normalize_url_prefix(url_prefix) for url_prefix in self.crawler.path}
+        links = {normalize_url_prefix(link.url_prefix): link for link in self.crawler.get_links()}
+        links = {title: link for title, link in links.items() if title not in visited}
+        if not links:
+            return
 
+        page, = self.get_pages([normalize_url_prefix(self.crawler.url_suffix)])
+        best_links = (normalize_url_prefix(title) for title in self.get_best_links(page, MAX_PAGES))
+        best_link = next((title for title in best_links if title in links), None)
+        if not best_link:
+            # The page is not in the reference data, rank the links on TheWikiGame page instead
+            best_link, _ = self.ranker.get_most_similar(list(links), self.goal.title)
 
-def run(crawler: WikiGameCrawler, ranker: SimilarityRanker):
+        if self.crawler.click(links[best_link]):
+            self.start, = self.get_pages([best_link])
+            self.fix_links()
+
+    def close(self):
+        pass
+
+
+def run(crawler: WikiGameCrawler, ranker: SimilarityRanker,
+        solver: Callable[[WikiGameCrawler, SimilarityRanker], Iddfs] = Iddfs, bot_name: str = BOT_NAME):
     iddfs, goal, max_breadth, max_depth = None, "", 0, 0
 
     while True:
         print("Starting game...")
-        crawler.new_game(BOT_NAME, GROUP_CODE)
+        crawler.new_game(bot_name, GROUP_CODE)
 
         is_new_game = crawler.goal != goal
         goal = crawler.goal
 
         if is_new_game:
-            iddfs = Iddfs(crawler, ranker)
+            if iddfs:
+                iddfs.close()
+            iddfs = solver(crawler, ranker)
             iddfs.fix_links()
             max_breadth = 6
             max_depth = 6
 
         while not crawler.is_game_over:
-            for solution in iddfs.solve(max_breadth=max_breadth, max_depth=max_depth):
+            path_length = len(crawler.path)
+            if crawler.replay_cached_path():
+                continue
+
+            if len(crawler.path) != path_length:
+                # The cached path broke partway, continue searching from the page it reached
+                iddfs.start, = iddfs.get_pages([normalize_url_prefix(crawler.url_suffix)])
+                iddfs.fix_links()
+
+            deadline, solved = crawler.scheduler.deadline(), False
+            for solution in iddfs.solve(max_breadth=max_breadth, max_depth=max_depth, deadline=deadline):
+                solved = True
 
                 print("************ Solution: ", solution)
 
@@ -112,8 +168,12 @@ def run(crawler: WikiGameCrawler, ranker: SimilarityRanker):
                                 crawler.back()
                             break
 
-            max_breadth += 1
-            max_depth += 1
+            # Searching deeper from a start page without links will not find anything either
+            if not solved and (deadline.expired or not iddfs.start.links):
+                iddfs.commit_best_link()
+            else:
+                max_breadth += 1
+                max_depth += 1
 
 
 if __name__ == '__main__':
@@ -0,0 +1,32 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.models import Link
+from wiki_game_ai.similarity import SimilarityRanker
+
+LOOKAHEAD_BREADTH = 10
+LOOKAHEAD_DECAY = 0.9
+
+
+def refine(ranker: SimilarityRanker, link_store: Optional[LinkStore], results: List[Tuple[str, float]],
+           links: Sequence[Link], reference: str) -> Iterable[List[Tuple[str, float]]]:
+    """
+    Anytime refinement of a ranking, to be consumed by MoveScheduler.decide.
+
+    Yields the ranking itself first. Then, best ranked first, every link of which the page has been observed before
+    is rescored by the most similar link on that page, and the updated ranking is yielded.
+    """
+    yield results
+
+    if not link_store:
+        return
+
+    url_prefixes = {link.title: link.url_prefix for link in links}
+    scores = dict(results)
+    for title, score in results[:LOOKAHEAD_BREADTH]:
+        if not (next_links := link_store.get(url_prefixes[title], max_age=None)):
+            continue
+
+        _, next_score = ranker.get_most_similar([link.title for link in next_links], reference)
+        scores[title] = max(score, LOOKAHEAD_DECAY * next_score)
+        yield sorted(scores.items(), key=lambda x: x[1], reverse=True)
@@ -47,6 +47,9 @@ class Mcts:
         self.ranker = ranker
 
     def run(self, crawler: WikiGameCrawler):
+        if crawler.replay_cached_path():
+            return
+
         self.root = Node(None, 0, None, 0)
         self.root.num_visits -= 1
         self.nodes = dict()
@@ -0,0 +1,191 @@
+import ctypes
+import multiprocessing
+import os
+from multiprocessing import Pool
+from multiprocessing.sharedctypes import RawArray
+from multiprocessing.synchronize import Event
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from zlib import crc32
+
+from tqdm import tqdm
+
+from wiki_game_ai.config import CONFIG
+from wiki_game_ai.crawler import WikiGameCrawler
+from wiki_game_ai.database.connection import PostgresConnection
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.scheduler import Deadline
+from wiki_game_ai.similarity import SimilarityRanker
+from wiki_game_ai.strategies import iddfs
+from wiki_game_ai.strategies.iddfs import Iddfs
+
+BOT_NAME = Path(__file__).stem.title() + "_Bot"
+NUM_WORKERS = os.cpu_count() or 1
+MAX_SPLIT_DEPTH = 3
+TABLE_SIZE = 1 << 20
+DEPTH_BITS = 8
+DEPTH_MASK = (1 << DEPTH_BITS) - 1
+
+_WORKER: Optional["IddfsWorker"] = None
+
+
+class SharedTranspositionTable:
+    """
+    Fixed size hash table of the deepest remaining depth searched per page, shared between processes.
+
+    Every slot packs the crc32 of the page title together with the depth into a single 64 bit integer,
+    so entries are written in one store without locking. Colliding pages simply replace each other.
+    """
+
+    def __init__(self, size: int = TABLE_SIZE):
+        self.table = RawArray(ctypes.c_int64, size)
+
+    def get(self, title: str, default: Optional[int] = None) -> Optional[int]:
+        key = crc32(title.encode())
+        entry = self.table[key % len(self.table)]
+        return entry & DEPTH_MASK if entry >> DEPTH_BITS == key else default
+
+    def __setitem__(self, title: str, depth: int):
+        key = crc32(title.encode())
+        self.table[key % len(self.table)] = key << DEPTH_BITS | min(depth, DEPTH_MASK)
+
+    def clear(self):
+        ctypes.memset(self.table, 0, ctypes.sizeof(self.table))
+
+
+class IddfsWorker(Iddfs):
+    """
+    Searches a single subtree of the root in a worker process, with its own database connection.
+    """
+
+    def __init__(self, ranker: SimilarityRanker, transpositions: SharedTranspositionTable, stop_event: Event):
+        super().__init__(None, ranker, PostgresConnection(**CONFIG["database"]), LinkStore())
+        self.transpositions = transpositions
+        self.stop_event = stop_event
+
+    def is_stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def solve_subtree(self, goal: str, path: List[str], depth: int, max_breadth: int,
+                      solutions: List[List[str]]) -> Optional[List[str]]:
+        if self.is_stopped():
+            return None
+
+        self.goal, page = self.get_pages([goal, path[-1]])
+        self.solutions = list(solutions)
+        return next(iter(self.solve_for_depth(page, depth, max_breadth, self.transpositions, path)), None)
+
+
+def _init_worker(encoder_name: str, transpositions: SharedTranspositionTable, stop_event: Event):
+    global _WORKER
+    _WORKER = IddfsWorker(SimilarityRanker(encoder_name), transpositions, stop_event)
+
+
+def _solve_subtree(args: Tuple[str, List[str], int, int, List[List[str]]]) -> Optional[List[str]]:
+    solution = _WORKER.solve_subtree(*args)
+    if solution:
+        _WORKER.stop_event.set()
+    return solution
+
+
+class ParallelIddfs(Iddfs):
+    """
+    Iterative Deepening Depth First Search, with the ranked subtrees below the start page split over worker processes.
+
+    The tree is split at the first level with a subtree for every worker, the pages above it are checked for the goal
+    in the main process before the workers are started, a solution there skips the workers for that iteration.
+    The workers share a transposition table, so a page searched by one worker is not searched again by the others
+    at the same or a shallower remaining depth. The first solution found at an iteration stops all workers, after
+    which the table is cleared, as the stopped workers did not finish the subtrees they entered.
+    """
+
+    def __init__(self, crawler: WikiGameCrawler, ranker: SimilarityRanker, num_workers: int = NUM_WORKERS):
+        super().__init__(crawler, ranker)
+        self.num_workers = num_workers
+        self.transpositions = SharedTranspositionTable()
+        self.stop_event = multiprocessing.Event()
+        self._pool = None
+
+    @property
+    def pool(self) -> Pool:
+        if not self._pool:
+            self._pool = Pool(self.num_workers, _init_worker,
+                              (self.ranker.encoder_name, self.transpositions, self.stop_event))
+        return self._pool
+
+    def solve(self, max_breadth: int, max_depth: int, deadline: Optional[Deadline] = None) -> Iterable[List[str]]:
+        self.deadline = deadline
+
+        if self.goal.title in self.start.links:
+            yield from self.solve_for_depth(self.start, 0, max_breadth, {}, [self.start.title])
+            return
+
+        levels = self.split(max_breadth)
+
+        self.transpositions.clear()
+        for _max_depth in tqdm(range(1, max_depth)):
+            if self.is_stopped():
+                return
+
+            self.stop_event.clear()
+            split_depth = min(len(levels) - 1, _max_depth)
+
+            # The workers only check the pages below the split for the goal, a solution above it skips the iteration
+            solutions = []
+            for paths in levels[1:split_depth]:
+                pages = self.get_pages([path[-1] for path in paths])
+                solutions += [path + [self.goal.title] for path, page in zip(paths, pages)
+                              if self.goal.title in page.links]
+            if solutions := [solution for solution in solutions if solution not in self.solutions]:
+                for solution in solutions:
+                    self.solutions.append(solution)
+                    yield solution
+                continue
+
+            for depth, paths in enumerate(levels[:split_depth]):
+                for path in paths:
+                    self.transpositions[path[-1]] = _max_depth - depth
+
+            tasks = [(self.goal.title, path, _max_depth - split_depth, max_breadth, self.solutions)
+                     for path in levels[split_depth]]
+            results = self.pool.imap_unordered(_solve_subtree, tasks)
+            completed = False
+            try:
+                for _ in tasks:
+                    solution = results.next(timeout=deadline.remaining if deadline else None)
+                    if solution and solution not in self.solutions:
+                        self.stop_event.set()
+                        self.solutions.append(solution)
+                        yield solution
+                completed = not self.stop_event.is_set()
+            except multiprocessing.TimeoutError:
+                return
+            finally:
+                # Wait for the remaining tasks to notice the stop event, so they don't run into the next search
+                self.stop_event.set()
+                for _ in results:
+                    pass
+                if not completed:
+                    self.transpositions.clear()
+
+    def split(self, max_breadth: int) -> List[List[List[str]]]:
+        """ The paths from the start page per level, down to the first level with a subtree for every worker. """
+        levels = [[[self.start.title]]]
+        while len(levels) == 1 or len(levels[-1]) < self.num_workers and len(levels) <= MAX_SPLIT_DEPTH:
+            pages = self.get_pages([path[-1] for path in levels[-1]])
+            paths = [path + [title] for path, page in zip(levels[-1], pages)
+                     for title in self.get_best_links(page, max_breadth)]
+            if not paths:
+                break
+            levels.append(paths)
+        return levels
+
+    def close(self):
+        if self._pool:
+            self.stop_event.set()
+            self._pool.terminate()
+            self._pool = None
+
+
+def run(crawler: WikiGameCrawler, ranker: SimilarityRanker):
+    iddfs.run(crawler, ranker, solver=ParallelIddfs, bot_name=BOT_NAME)
@@ -0,0 +1,307 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from math import log, sqrt
+from multiprocessing import Pool
+from pathlib import Path
+from random import Random
+from tempfile import mkdtemp
+from time import monotonic, sleep
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from wiki_game_ai.config import CONFIG
+from wiki_game_ai.crawler import WikiGameCrawler
+from wiki_game_ai.database.connection import PostgresConnection
+from wiki_game_ai.link_graph import LinkGraph
+from wiki_game_ai.link_store import LinkStore
+from wiki_game_ai.models import normalize_url_prefix
+from wiki_game_ai.scheduler import Deadline
+from wiki_game_ai.similarity import SimilarityRanker
+from wiki_game_ai.strategies.mcts import MAX_BREADTH, UCT_C
+
+BOT_NAME = Path(__file__).stem.title() + "_Bot"
+GROUP_CODE = CONFIG.get("group_code", None)
+CONNECTION = PostgresConnection(**CONFIG["database"])
+NUM_WORKERS = os.cpu_count() or 1
+NUM_PLAYOUTS = 10000
+ROLLOUT_DEPTH = 4
+BUILD_TIME_SHARE = 0.5
+LEAVES_PER_WORKER = 64
+WIN_SCORE = 1.0
+
+Statistics = Dict[int, Tuple[float, int]]
+
+_GRAPH: Optional[LinkGraph] = None
+
+
+class SimulationNode:
+    def __init__(self, page_id: int, parent: Optional["SimulationNode"], score: float = 0.0):
+        self.page_id = page_id
+        self.parent = parent
+        self.children = []
+        self.cum_score = score
+        self.num_visits = 1
+
+    @property
+    def score(self):
+        return self.cum_score / self.num_visits if self.num_visits > 0 else 0
+
+    @property
+    def is_leaf(self):
+        return not any(self.children)
+
+
+class Simulation:
+    """
+    Offline Monte Carlo Tree Search over a LinkGraph, following the same selection and expansion rules as Mcts
+    without clicking through the browser. Leaves are valued by the given evaluation function during a playout,
+    or by the caller when it selects, expands and backpropagates the leaves itself.
+    """
+
+    def __init__(self, graph: LinkGraph, root_id: int, goal_id: int,
+                 evaluate: Optional[Callable[[int], float]] = None):
+        self.graph = graph
+        self.goal_id = goal_id
+        self.evaluate = evaluate
+        self.root = SimulationNode(root_id, None)
+        self.root.num_visits -= 1
+
+    def playout(self):
+        node = self.select()
+        score = self.expand(node)
+        self.backpropagate(node, self.evaluate(node.page_id) if score is None else score)
+
+    def select(self) -> SimulationNode:
+        node = self.root
+        while not node.is_leaf:
+            node = self.selection(node)
+        return node
+
+    def backpropagate(self, node: SimulationNode, score: float, num_visits: int = 1):
+        while node:
+            node.cum_score += score
+            node.num_visits += num_visits
+            node = node.parent
+
+    def selection(self, node: SimulationNode) -> SimulationNode:
+        best_child, best_score = None, float('-inf')
+        for child in node.children:
+            uct_score = sqrt(2.0 * log(node.num_visits) / child.num_visits)
+            score = child.score + UCT_C * uct_score
+            if score > best_score:
+                best_score = score
+                best_child = child
+        return best_child
+
+    def expand(self, node: SimulationNode) -> Optional[float]:
+        """ Add the best children of the node, returns the score of a terminal node or None to evaluate it. """
+        if node.page_id == self.goal_id:
+            return WIN_SCORE
+
+        links = self.graph.links(node.page_id)
+        if not len(links):
+            return 0.0
+
+        similarities = self.graph.similarities(links, self.goal_id)
+        for i in np.argsort(similarities)[::-1][:MAX_BREADTH]:
+            node.children.append(SimulationNode(int(links[i]), node, float(similarities[i])))
+
+        return None
+
+    @property
+    def statistics(self) -> Statistics:
+        return {child.page_id: (child.cum_score, child.num_visits) for child in self.root.children}
+
+
+def rollout(graph: LinkGraph, page_id: int, goal_id: int, random: Random) -> float:
+    """ Random walk over the best ranked links, scored by the highest similarity to the goal along the way. """
+    best_score = 0.0
+    for _ in range(ROLLOUT_DEPTH):
+        links = graph.links(page_id)
+        if not len(links):
+            break
+
+        similarities = graph.similarities(links, goal_id)
+        candidates = np.argsort(similarities)[::-1][:MAX_BREADTH]
+        choice = candidates[random.randrange(len(candidates))]
+        page_id = int(links[choice])
+        if page_id == goal_id:
+            return WIN_SCORE
+
+        best_score = max(best_score, float(similarities[choice]))
+    return best_score
+
+
+def _init_worker(directory: str):
+    global _GRAPH
+    _GRAPH = LinkGraph.load(Path(directory))
+
+
+def _search_root(args: Tuple[int, int, int, float, int]) -> Statistics:
+    root_id, goal_id, num_playouts, end, seed = args
+    random = Random(seed)
+    simulation = Simulation(_GRAPH, root_id, goal_id, lambda page_id: rollout(_GRAPH, page_id, goal_id, random))
+    for _ in range(num_playouts):
+        if monotonic() >= end:
+            break
+        simulation.playout()
+    return simulation.statistics
+
+
+def _rollouts(args: Tuple[List[int], int, int]) -> List[float]:
+    page_ids, goal_id, seed = args
+    random = Random(seed)
+    return [rollout(_GRAPH, page_id, goal_id, random) for page_id in page_ids]
+
+
+class ParallelMcts(ABC):
+    """
+    Parallel variant of Mcts, simulating playouts offline on a LinkGraph built from the Wikipedia reference data.
+
+    The graph is saved once per neighbourhood to a temporary directory, from which the worker processes memory-map
+    the link and embedding arrays. The pool of workers lives as long as the graph, so it is only started again when
+    the search leaves the neighbourhood. After the search the best child of the root is clicked in the browser.
+    """
+
+    def __init__(self, ranker: SimilarityRanker, num_workers: int = NUM_WORKERS, num_playouts: int = NUM_PLAYOUTS):
+        self.ranker = ranker
+        self.num_workers = num_workers
+        self.num_playouts = num_playouts
+        self.random = Random()
+        self.graph = None
+        self.directory = None
+        self._pool = None
+
+    @property
+    def pool(self) -> Pool:
+        if not self._pool:
+            self._pool = Pool(self.num_workers, _init_worker, (str(self.directory),))
+        return self._pool
+
+    def run(self, crawler: WikiGameCrawler):
+        while not crawler.is_game_over:
+            if crawler.replay_cached_path():
+                continue
+
+            if links := crawler.get_links():
+                deadline = crawler.scheduler.deadline()
+                current, goal = normalize_url_prefix(crawler.url_suffix), normalize_url_prefix(crawler.goal)
+                if not self.graph or goal not in self.graph.ids or not self.graph.is_expanded(current):
+                    # Building the graph takes at most part of the move time, the search gets the rest
+                    build_deadline = Deadline(BUILD_TIME_SHARE * deadline.remaining, deadline.clock)
+                    self.build_graph(current, goal, crawler.link_store, build_deadline)
+
+                statistics = self.search(self.pool, self.graph.ids[current], self.graph.ids[goal], deadline)
+
+                # Only consider links actually present on TheWikiGame, most visited first
+                links_by_url_prefix = {normalize_url_prefix(link.url_prefix): link for link in links}
+                ranked = sorted(statistics.items(), key=lambda x: x[1][1], reverse=True)
+                best_link = next((links_by_url_prefix[self.graph.titles[page_id]] for page_id, _ in ranked
+                                  if self.graph.titles[page_id] in links_by_url_prefix), None)
+                if not best_link:
+                    best_title, _ = self.ranker.get_most_similar([link.title for link in links], goal)
+                    best_link = next(link for link in links if link.title == best_title)
+
+                print(f"Chosen {best_link} based on {sum(visits for _, visits in statistics.values())} playouts")
+                crawler.click(best_link)
+
+                if crawler.has_won:
+                    print("WIN!!!")
+                    sleep(3)
+
+    def build_graph(self, start: str, goal: str, link_store: Optional[LinkStore] = None,
+                    deadline: Optional[Deadline] = None):
+        self.close()
+        self.graph = LinkGraph.build(CONNECTION, self.ranker, start, goal, max_breadth=MAX_BREADTH,
+                                     link_store=link_store, deadline=deadline)
+        self.directory = Path(mkdtemp(prefix="link_graph_"))
+        self.graph.save(self.directory)
+        print(f"Built link graph of {len(self.graph)} pages around {start}")
+
+    @abstractmethod
+    def search(self, pool: Pool, root_id: int, goal_id: int, deadline: Deadline) -> Statistics:
+        """ Run playouts until the deadline or until num_playouts is reached. """
+
+    def close(self):
+        if self._pool:
+            self._pool.terminate()
+            self._pool = None
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.graph, self.directory = None, None
+
+
+class RootParallelMcts(ParallelMcts):
+    """
+    Root parallelization: every worker grows an independent tree with its share of the playouts,
+    after which the visit counts and scores of the root children are merged.
+    """
+
+    def search(self, pool: Pool, root_id: int, goal_id: int, deadline: Deadline) -> Statistics:
+        num_playouts = -(-self.num_playouts // self.num_workers)
+        tasks = [(root_id, goal_id, num_playouts, deadline.end, self.random.getrandbits(32))
+                 for _ in range(self.num_workers)]
+
+        statistics = {}
+        for worker_statistics in pool.map(_search_root, tasks):
+            for page_id, (cum_score, num_visits) in worker_statistics.items():
+                total_score, total_visits = statistics.get(page_id, (0.0, 0))
+                statistics[page_id] = (total_score + cum_score, total_visits + num_visits)
+        return statistics
+
+
+class LeafParallelMcts(ParallelMcts):
+    """
+    Leaf parallelization: a single tree is grown in the main process, while the expanded leaves are valued by
+    rollouts in the workers.
+
+    Every round trip to the pool evaluates a batch of leaves_per_worker leaves per worker. The leaves of a batch are
+    selected with a virtual loss: their visit is counted at selection, so the next selections spread over the tree,
+    and their score is added once the rollouts return.
+    """
+
+    def __init__(self, ranker: SimilarityRanker, num_workers: int = NUM_WORKERS, num_playouts: int = NUM_PLAYOUTS,
+                 leaves_per_worker: int = LEAVES_PER_WORKER):
+        super().__init__(ranker, num_workers, num_playouts)
+        self.leaves_per_worker = leaves_per_worker
+
+    def search(self, pool: Pool, root_id: int, goal_id: int, deadline: Deadline) -> Statistics:
+        simulation = Simulation(self.graph, root_id, goal_id)
+        num_playouts = 0
+        while num_playouts < self.num_playouts and not deadline.expired:
+            leaves = []
+            for _ in range(min(self.num_workers * self.leaves_per_worker, self.num_playouts - num_playouts)):
+                node = simulation.select()
+                score = simulation.expand(node)
+                simulation.backpropagate(node, 0.0 if score is None else score)
+                if score is None:
+                    leaves.append(node)
+                num_playouts += 1
+
+            tasks = [([leaf.page_id for leaf in leaves[i::self.num_workers]], goal_id, self.random.getrandbits(32))
+                     for i in range(min(self.num_workers, len(leaves)))]
+            for i, scores in enumerate(pool.map(_rollouts, tasks)):
+                for leaf, score in zip(leaves[i::self.num_workers], scores):
+                    simulation.backpropagate(leaf, score, num_visits=0)
+        return simulation.statistics
+
+
+def run(crawler: WikiGameCrawler, ranker: SimilarityRanker, leaf_parallel: bool = False):
+    goal = ""
+    mcts = None
+
+    while True:
+        print("Starting game...")
+        crawler.new_game(BOT_NAME, GROUP_CODE)
+
+        is_new_game = crawler.goal != goal
+        goal = crawler.goal
+
+        if is_new_game:
+            if mcts:
+                mcts.close()
+            mcts = LeafParallelMcts(ranker) if leaf_parallel else RootParallelMcts(ranker)
+
+        mcts.run(crawler)